@@ -1,11 +1,70 @@
 import os
 import sys
+from dataclasses import asdict
+from typing import Any, Dict, Optional
 
 # Ensure repo root is on PYTHONPATH (needed for Streamlit Cloud)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+import pandas as pd
 import streamlit as st
-from src.engine import GRINDER_064S, RecipeInput, generate_recipe
+from src.engine import (
+    GRINDER_064S,
+    HISTORY_PATH,
+    RecipeInput,
+    generate_recipe,
+    load_history_records,
+    make_history_record,
+    save_history_record,
+)
+from app.widgets import brew_inputs
+
+
+@st.cache_data(show_spinner=False)
+def generate_recipe_cached(
+    roast_level: str,
+    method: str,
+    grinder: str,
+    coffee_g: float,
+    water_g: float,
+    taste_goal: str,
+    baseline_grind: Optional[float],
+) -> Dict[str, Any]:
+    """
+    Memoized generate_recipe keyed on plain input values (Streamlit reruns the whole script).
+    """
+    inp = RecipeInput(
+        roast_level=roast_level,
+        method=method,
+        grinder=grinder,
+        coffee_g=coffee_g,
+        water_g=water_g,
+        taste_goal=taste_goal,
+        baseline_grind=baseline_grind,
+    )
+    return generate_recipe(inp)
+
+
+HISTORY_COLUMNS = ["timestamp", "method", "roast_level", "ratio", "grind"]
+SOURCE_COLUMNS = ["timestamp", "method", "roast_level", "ratio", "grind_setting"]
+
+
+@st.cache_data(show_spinner=False)
+def _load_history_cached(mtime: float, limit: int) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(load_history_records(limit=limit))
+    if df.empty:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    df = df.reindex(columns=SOURCE_COLUMNS)
+    df["grind"] = df["grind_setting"].map(lambda g: g.get("recommended", "") if isinstance(g, dict) else "")
+    return df[HISTORY_COLUMNS]
+
+
+def load_history_cached(limit: int = 20) -> pd.DataFrame:
+    """
+    History table (newest first) that only re-reads the file when its mtime changes.
+    """
+    mtime = HISTORY_PATH.stat().st_mtime if HISTORY_PATH.exists() else 0.0
+    return _load_history_cached(mtime, limit)
 
 
 st.set_page_config(page_title="Coffee Recipe Generator", page_icon="☕", layout="centered")
@@ -61,95 +120,38 @@ if c2.button("Preset: Espresso Light (18g in / 36g out)"):
 # ----------------------------
 st.subheader("Inputs")
 
-grinder = st.selectbox("Grinder", [GRINDER_064S])
-
-roast_level = st.selectbox(
-    "Roast level",
-    ["light", "medium", "dark"],
-    key="roast_level",
-)
-
+# Method picks which input panel is shown, so it stays outside the form
 method = st.selectbox(
     "Brew method",
     ["V60", "ESPRESSO"],
     key="method",
 )
 
-taste_goal = st.selectbox(
-    "Taste goal",
-    ["balanced", "sweeter", "brighter", "less_bitter"],
-    key="taste_goal",
-)
+# Everything else is batched: edits don't rerun the script until submit
+with st.form("recipe_form"):
+    grinder = st.selectbox("Grinder", [GRINDER_064S])
 
-# Baseline (per method)
-st.markdown("### Grinder calibration (optional)")
-use_baseline = st.checkbox("Use my baseline", key="use_baseline")
-
-if st.session_state["method"] == "V60":
-    baseline = st.number_input(
-        "My baseline grind (064S dial) for V60",
-        min_value=8.0,
-        max_value=13.0,
-        value=float(st.session_state["baseline_v60"]),
-        step=0.1,
-        key="baseline_v60",
-    )
-    baseline_grind = float(baseline) if use_baseline else None
-
-    coffee_g = st.number_input(
-        "Coffee (g)",
-        min_value=5.0,
-        max_value=60.0,
-        value=float(st.session_state["coffee_g"]),
-        step=1.0,
-        key="coffee_g",
-    )
-    water_g = st.number_input(
-        "Water (g)",
-        min_value=50.0,
-        max_value=1500.0,
-        value=float(st.session_state["water_g"]),
-        step=10.0,
-        key="water_g",
-    )
-    st.caption(f"Current ratio: 1:{round(water_g / coffee_g, 1)}")
-
-else:
-    baseline = st.number_input(
-        "My baseline grind (064S dial) for Espresso",
-        min_value=1.0,
-        max_value=4.0,
-        value=float(st.session_state["baseline_espresso"]),
-        step=0.1,
-        key="baseline_espresso",
-    )
-    baseline_grind = float(baseline) if use_baseline else None
-
-    st.caption("Typical espresso: 18g in → ~36g out in ~25–30s")
-    coffee_g = st.number_input(
-        "Dose (g)",
-        min_value=10.0,
-        max_value=25.0,
-        value=float(st.session_state["coffee_g"]),
-        step=0.5,
-        key="coffee_g",
+    roast_level = st.selectbox(
+        "Roast level",
+        ["light", "medium", "dark"],
+        key="roast_level",
     )
-    water_g = st.number_input(
-        "Target yield (g out)",
-        min_value=15.0,
-        max_value=80.0,
-        value=float(st.session_state["water_g"]),
-        step=1.0,
-        key="water_g",
+
+    taste_goal = st.selectbox(
+        "Taste goal",
+        ["balanced", "sweeter", "brighter", "less_bitter"],
+        key="taste_goal",
     )
-    st.caption(f"Current yield ratio: 1:{round(water_g / coffee_g, 2)}")
+
+    coffee_g, water_g, baseline_grind = brew_inputs(method)
+
+    submitted = st.form_submit_button("Generate recipe", type="primary")
 
 
 # ----------------------------
 # Generate
 # ----------------------------
-st.markdown("---")
-if st.button("Generate recipe", type="primary"):
+if submitted:
     inp = RecipeInput(
         roast_level=roast_level,
         method=method,
@@ -159,12 +161,16 @@ if st.button("Generate recipe", type="primary"):
         taste_goal=taste_goal,
         baseline_grind=baseline_grind,
     )
+    # Kept in session state so other buttons (which rerun the script) don't wipe it
+    st.session_state["last_input"] = inp
+    st.session_state["last_recipe"] = generate_recipe_cached(**asdict(inp))
+    st.session_state["last_saved"] = False
 
-    recipe = generate_recipe(inp)
-
+recipe = st.session_state.get("last_recipe")
+if recipe is not None:
     st.subheader("Recipe")
 
-    if method == "V60":
+    if recipe["method"] == "V60":
         st.write(f"**Ratio:** 1:{recipe['ratio']}")
         st.write(f"**Water temp:** {recipe['water_temp_c']} °C")
         st.write(f"**Target time:** ~{recipe['target_time_s']//60}:{recipe['target_time_s']%60:02d}")
@@ -180,14 +186,33 @@ if st.button("Generate recipe", type="primary"):
     )
 
     st.subheader("Steps")
-    for s in recipe["steps"]:
-        st.write(f"- {s}")
+    st.markdown(recipe["steps_md"])
 
     st.subheader("Adjustments")
-    for a in recipe["adjustments"]:
-        st.write(f"- {a}")
+    st.markdown("\n".join(f"- {a}" for a in recipe["adjustments"]))
 
     # Copy-friendly output
     st.subheader("Copy-friendly recipe")
     recipe_text = "\n".join(recipe["steps"])
     st.text_area("Copy this", recipe_text, height=220)
+
+    if st.session_state["last_saved"]:
+        st.caption("Saved to history.")
+    elif st.button("Save to history"):
+        save_history_record(make_history_record(st.session_state["last_input"], recipe))
+        _load_history_cached.clear()
+        st.session_state["last_saved"] = True
+        st.rerun()
+
+
+# ----------------------------
+# History
+# ----------------------------
+st.markdown("---")
+with st.expander("History (last 10 saved recipes)"):
+    st.caption("Saved recipes are stored on the server and visible to everyone using this app.")
+    df = load_history_cached(limit=10)
+    if df.empty:
+        st.info("No saved recipes yet.")
+    else:
+        st.dataframe(df, hide_index=True)
@@ -0,0 +1,86 @@
+from typing import NamedTuple, Optional, Tuple
+
+import streamlit as st
+
+from src.engine import GRINDER_064S, GRINDER_RANGES
+
+
+class NumberSpec(NamedTuple):
+    label: str
+    min_value: float
+    max_value: float
+    step: float
+
+
+class BrewInputSpec(NamedTuple):
+    baseline_label: str
+    baseline_key: str
+    hint: Optional[str]
+    coffee: NumberSpec
+    water: NumberSpec
+    ratio_label: str
+    ratio_digits: int
+
+
+# Per-method labels/limits for the brew input panel
+BREW_INPUT_SPECS = {
+    "V60": BrewInputSpec(
+        baseline_label="My baseline grind (064S dial) for V60",
+        baseline_key="baseline_v60",
+        hint=None,
+        coffee=NumberSpec("Coffee (g)", 5.0, 60.0, 1.0),
+        water=NumberSpec("Water (g)", 50.0, 1500.0, 10.0),
+        ratio_label="Current ratio",
+        ratio_digits=1,
+    ),
+    "ESPRESSO": BrewInputSpec(
+        baseline_label="My baseline grind (064S dial) for Espresso",
+        baseline_key="baseline_espresso",
+        hint="Typical espresso: 18g in → ~36g out in ~25–30s",
+        coffee=NumberSpec("Dose (g)", 10.0, 25.0, 0.5),
+        water=NumberSpec("Target yield (g out)", 15.0, 80.0, 1.0),
+        ratio_label="Current yield ratio",
+        ratio_digits=2,
+    ),
+}
+
+
+def _number_input(spec: NumberSpec, key: str) -> float:
+    return st.number_input(
+        spec.label,
+        min_value=spec.min_value,
+        max_value=spec.max_value,
+        value=float(st.session_state[key]),
+        step=spec.step,
+        key=key,
+    )
+
+
+def brew_inputs(method: str) -> Tuple[float, float, Optional[float]]:
+    """
+    Render grinder calibration + dose/water inputs for the given method.
+    Returns (coffee_g, water_g, baseline_grind).
+    """
+    spec = BREW_INPUT_SPECS[method]
+    grind_range = GRINDER_RANGES[GRINDER_064S][method]
+
+    st.markdown("### Grinder calibration (optional)")
+    use_baseline = st.checkbox("Use my baseline", key="use_baseline")
+
+    baseline = st.number_input(
+        spec.baseline_label,
+        min_value=grind_range["min"],
+        max_value=grind_range["max"],
+        value=float(st.session_state[spec.baseline_key]),
+        step=0.1,
+        key=spec.baseline_key,
+    )
+    baseline_grind = float(baseline) if use_baseline else None
+
+    if spec.hint:
+        st.caption(spec.hint)
+    coffee_g = _number_input(spec.coffee, "coffee_g")
+    water_g = _number_input(spec.water, "water_g")
+    st.caption(f"{spec.ratio_label}: 1:{round(water_g / coffee_g, spec.ratio_digits)}")
+
+    return float(coffee_g), float(water_g), baseline_grind
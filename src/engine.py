@@ -2,6 +2,7 @@ from dataclasses import dataclass, asdict
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 from datetime import datetime
+from collections import deque
 import json
 
 
@@ -16,9 +17,44 @@ GRINDER_RANGES = {
 }
 
 
-# --- Storage (local JSON) ---
+# --- Recipe lookup tables ---
+# method -> roast -> (water temp °C, target time s, default grind baseline)
+ROAST_PROFILES = {
+    "V60": {
+        "light": (94, 180, 12.5),
+        "medium": (92, 170, 11.0),
+        "dark": (90, 155, 10.0),
+    },
+    "ESPRESSO": {
+        "light": (94, 28, 2.5),
+        "medium": (93, 28, 2.0),
+        "dark": (92, 28, 1.6),
+    },
+}
+
+# method -> taste goal -> (grind shift, temp delta °C, time delta s, adjustment note)
+TASTE_PROFILES = {
+    "V60": {
+        "balanced": (0.0, 0, 0, "Baseline recipe. Adjust one variable at a time."),
+        "sweeter": (-0.2, 0, +10, "Try +10s total time with an even pour."),
+        "brighter": (-0.4, +1, 0, "Sour/under-extracted? Go slightly finer or pour slower."),
+        "less_bitter": (+0.4, -1, -10, "Bitter/over-extracted? Go slightly coarser or shorten time."),
+    },
+    "ESPRESSO": {
+        "balanced": (0.0, 0, 0, "Adjust grind first, then yield, then temperature."),
+        "sweeter": (-0.1, 0, 0, "Keep dose consistent; adjust grind in tiny steps; aim 25–30s."),
+        "brighter": (-0.2, 0, 0, "If sour/fast: grind finer OR increase yield slightly."),
+        "less_bitter": (+0.2, 0, 0, "If bitter/slow: grind coarser OR reduce yield slightly."),
+    },
+}
+
+_TASTE_GOAL_ERROR = "taste_goal must be: balanced, sweeter, brighter, or less_bitter"
+
+
+# --- Storage (local JSON Lines, one record per line) ---
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
-HISTORY_PATH = DATA_DIR / "history.json"
+HISTORY_PATH = DATA_DIR / "history.jsonl"
+HISTORY_TAIL_BLOCK = 64 * 1024  # files up to this size are read whole; larger ones from the end
 
 
 @dataclass(frozen=True)
@@ -40,39 +76,85 @@ def _now_iso() -> str:
     return datetime.now().isoformat(timespec="seconds")
 
 
+def make_history_record(inp: RecipeInput, recipe: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a compact history entry: timestamp, the inputs (enough to replay it)
+    and the headline numbers. Steps/adjustments are derived and not stored.
+    """
+    grind = recipe["grind_setting"]
+    return {
+        "timestamp": _now_iso(),
+        **asdict(inp),
+        "ratio": recipe["ratio"],
+        "water_temp_c": recipe["water_temp_c"],
+        "target_time_s": recipe["target_time_s"],
+        "grind_setting": {
+            "recommended": grind["recommended"],
+            "baseline_used": grind["baseline_used"],
+        },
+    }
+
+
 def save_history_record(record: Dict[str, Any]) -> None:
     """
-    Append a record to data/history.json (creates file if missing).
+    Append a record as one line to data/history.jsonl (creates file if missing).
     """
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-    existing: List[Dict[str, Any]] = []
-    if HISTORY_PATH.exists():
-        try:
-            existing = json.loads(HISTORY_PATH.read_text(encoding="utf-8"))
-            if not isinstance(existing, list):
-                existing = []
-        except Exception:
-            existing = []
+    with HISTORY_PATH.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
 
-    existing.append(record)
-    HISTORY_PATH.write_text(json.dumps(existing, ensure_ascii=False, indent=2), encoding="utf-8")
+def _tail_lines(path: Path, limit: int) -> List[bytes]:
+    """
+    Return the last `limit` lines of a file as raw bytes, scanning backwards
+    from the end in blocks so large histories aren't read in full.
+    """
+    with path.open("rb") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        if size <= HISTORY_TAIL_BLOCK:
+            f.seek(0)
+            return list(deque(f, maxlen=limit))
+
+        pos = size
+        buf = b""
+        # limit + 1 newlines guarantee `limit` complete lines after the cut
+        while pos > 0 and buf.count(b"\n") <= limit:
+            step = min(HISTORY_TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+
+    lines = buf.splitlines()
+    if pos > 0:
+        lines = lines[1:]  # first line is cut mid-record
+    return lines[-limit:]
 
 
 def load_history_records(limit: int = 20) -> List[Dict[str, Any]]:
     """
-    Load last N records from history.
+    Load last N records from history (newest first).
+    Only the tail of the file is read; broken or torn lines are skipped.
     """
-    if not HISTORY_PATH.exists():
+    if limit <= 0 or not HISTORY_PATH.exists():
         return []
+
     try:
-        data = json.loads(HISTORY_PATH.read_text(encoding="utf-8"))
-        if not isinstance(data, list):
-            return []
-        return data[-limit:][::-1]  # newest first
-    except Exception:
+        tail = _tail_lines(HISTORY_PATH, limit)
+    except OSError:
         return []
 
+    records: List[Dict[str, Any]] = []
+    for line in reversed(tail):
+        try:
+            rec = json.loads(line.decode("utf-8"))
+        except ValueError:  # includes UnicodeDecodeError from torn multibyte chars
+            continue
+        if isinstance(rec, dict):
+            records.append(rec)
+    return records
+
 
 def recommend_grind_setting_064s(
     method: str,
@@ -89,59 +171,35 @@ def recommend_grind_setting_064s(
         raise ValueError("Method must be V60 or ESPRESSO")
 
     r = GRINDER_RANGES[GRINDER_064S][method]
-    gmin, gmax = float(r["min"]), float(r["max"])
 
     roast = roast_level.lower().strip()
 
     # Default baseline (if user didn't provide calibration)
-    if method == "V60":
-        if roast == "light":
-            default_base = 12.5
-        elif roast == "medium":
-            default_base = 11.0
-        elif roast == "dark":
-            default_base = 10.0
-        else:
-            default_base = (gmin + gmax) / 2.0
-    else:  # ESPRESSO
-        if roast == "light":
-            default_base = 2.5
-        elif roast == "medium":
-            default_base = 2.0
-        elif roast == "dark":
-            default_base = 1.6
-        else:
-            default_base = (gmin + gmax) / 2.0
-
-    base = _clamp(float(baseline_grind), gmin, gmax) if baseline_grind is not None else default_base
+    profile = ROAST_PROFILES[method].get(roast)
+    default_base = profile[2] if profile is not None else (r["min"] + r["max"]) / 2.0
 
     # Taste goal shifts (for "generate recipe" suggestions)
-    t = taste_goal.lower().strip()
-    shift = 0.0
+    try:
+        shift = TASTE_PROFILES[method][taste_goal.lower().strip()][0]
+    except KeyError:
+        raise ValueError(_TASTE_GOAL_ERROR) from None
 
-    if method == "V60":
-        if t == "brighter":
-            shift = -0.4
-        elif t == "sweeter":
-            shift = -0.2
-        elif t == "less_bitter":
-            shift = +0.4
-        elif t == "balanced":
-            shift = 0.0
-        else:
-            raise ValueError("taste_goal must be: balanced, sweeter, brighter, or less_bitter")
-    else:  # ESPRESSO
-        if t == "brighter":
-            shift = -0.2
-        elif t == "sweeter":
-            shift = -0.1
-        elif t == "less_bitter":
-            shift = +0.2
-        elif t == "balanced":
-            shift = 0.0
-        else:
-            raise ValueError("taste_goal must be: balanced, sweeter, brighter, or less_bitter")
+    return _grind_setting_064s(method, default_base, shift, baseline_grind)
+
+
+def _grind_setting_064s(
+    method: str,
+    default_base: float,
+    shift: float,
+    baseline_grind: Optional[float],
+) -> Dict[str, Any]:
+    """
+    Numeric core of recommend_grind_setting_064s, for already validated inputs.
+    """
+    r = GRINDER_RANGES[GRINDER_064S][method]
+    gmin, gmax = float(r["min"]), float(r["max"])
 
+    base = _clamp(float(baseline_grind), gmin, gmax) if baseline_grind is not None else default_base
     rec = _clamp(base + shift, gmin, gmax)
 
     return {
@@ -261,30 +319,12 @@ def generate_recipe(inp: RecipeInput) -> Dict[str, Any]:
     roast = inp.roast_level.lower().strip()
     method = inp.method
 
-    if method == "V60":
-        if roast == "light":
-            temp_c = 94
-            target_time_s = 180
-        elif roast == "medium":
-            temp_c = 92
-            target_time_s = 170
-        elif roast == "dark":
-            temp_c = 90
-            target_time_s = 155
-        else:
-            raise ValueError("roast_level must be: light, medium, or dark")
-    elif method == "ESPRESSO":
-        if roast == "light":
-            temp_c = 94
-        elif roast == "medium":
-            temp_c = 93
-        elif roast == "dark":
-            temp_c = 92
-        else:
-            raise ValueError("roast_level must be: light, medium, or dark")
-        target_time_s = 28
-    else:
+    if method not in ROAST_PROFILES:
         raise ValueError("method must be: V60 or ESPRESSO")
+    try:
+        temp_c, target_time_s, default_base = ROAST_PROFILES[method][roast]
+    except KeyError:
+        raise ValueError("roast_level must be: light, medium, or dark") from None
 
     if inp.coffee_g <= 0:
         raise ValueError("coffee_g must be > 0")
@@ -294,42 +334,16 @@ def generate_recipe(inp: RecipeInput) -> Dict[str, Any]:
     else:
         ratio = round(inp.water_g / inp.coffee_g, 2)
 
-    adjustments: List[str] = []
-    taste = inp.taste_goal.lower().strip()
+    try:
+        shift, temp_delta, time_delta, note = TASTE_PROFILES[method][inp.taste_goal.lower().strip()]
+    except KeyError:
+        raise ValueError(_TASTE_GOAL_ERROR) from None
 
-    if method == "V60":
-        if taste == "brighter":
-            temp_c += 1
-            adjustments.append("Sour/under-extracted? Go slightly finer or pour slower.")
-        elif taste == "sweeter":
-            target_time_s += 10
-            adjustments.append("Try +10s total time with an even pour.")
-        elif taste == "less_bitter":
-            temp_c -= 1
-            target_time_s -= 10
-            adjustments.append("Bitter/over-extracted? Go slightly coarser or shorten time.")
-        elif taste == "balanced":
-            adjustments.append("Baseline recipe. Adjust one variable at a time.")
-        else:
-            raise ValueError("taste_goal must be: balanced, sweeter, brighter, or less_bitter")
-    else:
-        if taste == "brighter":
-            adjustments.append("If sour/fast: grind finer OR increase yield slightly.")
-        elif taste == "sweeter":
-            adjustments.append("Keep dose consistent; adjust grind in tiny steps; aim 25–30s.")
-        elif taste == "less_bitter":
-            adjustments.append("If bitter/slow: grind coarser OR reduce yield slightly.")
-        elif taste == "balanced":
-            adjustments.append("Adjust grind first, then yield, then temperature.")
-        else:
-            raise ValueError("taste_goal must be: balanced, sweeter, brighter, or less_bitter")
+    temp_c += temp_delta
+    target_time_s += time_delta
+    adjustments: List[str] = [note]
 
-    grind_info = recommend_grind_setting_064s(
-        method=method,
-        taste_goal=inp.taste_goal,
-        roast_level=inp.roast_level,
-        baseline_grind=inp.baseline_grind,
-    )
+    grind_info = _grind_setting_064s(method, default_base, shift, inp.baseline_grind)
 
     if method == "V60":
         steps = [
@@ -362,6 +376,7 @@ def generate_recipe(inp: RecipeInput) -> Dict[str, Any]:
         "target_time_s": target_time_s,
         "grind_setting": grind_info,
         "steps": steps,
+        "steps_md": "\n".join(f"- {s}" for s in steps),
         "adjustments": adjustments,
     }
 
@@ -1,7 +1,14 @@
+import pytest
+
+import src.engine as engine
 from src.engine import (
     RecipeInput,
     generate_recipe,
     dial_in_assistant,
+    save_history_record,
+    make_history_record,
+    recommend_grind_setting_064s,
+    load_history_records,
     GRINDER_064S,
 )
 
@@ -22,6 +29,7 @@ def test_generate_recipe_v60_runs():
     assert recipe["method"] == "V60"
     assert "grind_setting" in recipe
     assert 8.0 <= recipe["grind_setting"]["recommended"] <= 13.0
+    assert recipe["steps_md"].splitlines() == [f"- {s}" for s in recipe["steps"]]
 
 
 def test_dial_in_assistant_espresso_returns_suggestion():
@@ -36,3 +44,122 @@ def test_dial_in_assistant_espresso_returns_suggestion():
 
     assert advice["method"] == "ESPRESSO"
     assert "suggested_grind" in advice
+
+
+def test_history_appends_jsonl_and_loads_newest_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(engine, "HISTORY_PATH", tmp_path / "history.jsonl")
+
+    assert load_history_records() == []
+
+    for i in range(5):
+        save_history_record({"n": i, "method": "V60"})
+
+    lines = (tmp_path / "history.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 5
+
+    rows = load_history_records(limit=3)
+    assert [r["n"] for r in rows] == [4, 3, 2]
+
+
+def test_history_skips_torn_lines_and_reads_tail_of_large_file(tmp_path, monkeypatch):
+    path = tmp_path / "history.jsonl"
+    monkeypatch.setattr(engine, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(engine, "HISTORY_PATH", path)
+    monkeypatch.setattr(engine, "HISTORY_TAIL_BLOCK", 256)
+
+    for i in range(50):
+        save_history_record({"n": i, "temp": "94°C"})
+
+    # Torn write that cuts a multibyte character, followed by later saves
+    with path.open("ab") as f:
+        f.write('{"a":"°'.encode("utf-8")[:-1])
+    save_history_record({"n": 50, "temp": "94°C"})
+    save_history_record({"n": 51, "temp": "94°C"})
+
+    rows = load_history_records(limit=5)
+    assert [r["n"] for r in rows] == [51, 49, 48, 47]  # torn bytes + record 50 form one skipped line
+    assert rows[0]["temp"] == "94°C"
+
+
+def test_make_history_record_keeps_inputs_and_headline_numbers_only():
+    inp = RecipeInput(
+        roast_level="medium",
+        method="ESPRESSO",
+        grinder=GRINDER_064S,
+        coffee_g=18.0,
+        water_g=36.0,
+        taste_goal="balanced",
+    )
+    recipe = generate_recipe(inp)
+
+    rec = make_history_record(inp, recipe)
+
+    assert rec["method"] == "ESPRESSO"
+    assert rec["roast_level"] == "medium"
+    assert rec["ratio"] == recipe["ratio"]
+    assert rec["grind_setting"]["recommended"] == recipe["grind_setting"]["recommended"]
+    assert not {"steps", "steps_md", "adjustments"} & rec.keys()
+
+
+def _recipe(method="V60", roast_level="light", taste_goal="balanced", water_g=300.0):
+    return generate_recipe(
+        RecipeInput(
+            roast_level=roast_level,
+            method=method,
+            grinder=GRINDER_064S,
+            coffee_g=18.0,
+            water_g=water_g,
+            taste_goal=taste_goal,
+        )
+    )
+
+
+def test_generate_recipe_v60_less_bitter_adjusts_temp_time_and_grind():
+    base = _recipe(roast_level="medium")
+    recipe = _recipe(roast_level="medium", taste_goal="less_bitter")
+
+    assert (base["water_temp_c"], base["target_time_s"]) == (92, 170)
+    assert recipe["water_temp_c"] == 91
+    assert recipe["target_time_s"] == 160
+    assert recipe["grind_setting"]["recommended"] == 11.4  # default 11.0 + 0.4
+
+
+def test_generate_recipe_espresso_dark_brighter():
+    recipe = _recipe(method="ESPRESSO", roast_level="dark", taste_goal="brighter", water_g=36.0)
+
+    assert recipe["water_temp_c"] == 92
+    assert recipe["target_time_s"] == 28
+    assert recipe["ratio"] == 2.0
+    assert recipe["grind_setting"]["recommended"] == 1.4  # default 1.6 - 0.2
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"roast_level": "blonde"}, "roast_level"),
+        ({"taste_goal": "fruity"}, "taste_goal"),
+        ({"method": "FRENCH_PRESS"}, "method"),
+    ],
+)
+def test_generate_recipe_rejects_unknown_values(kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        _recipe(**kwargs)
+
+
+def test_recommend_grind_setting_fallbacks_and_clamping():
+    # Unknown roast falls back to the middle of the V60 range (8–13)
+    assert recommend_grind_setting_064s("V60", "balanced", "blonde")["recommended"] == 10.5
+
+    # Out-of-range baseline is clamped before and after the taste shift
+    high = recommend_grind_setting_064s("V60", "less_bitter", "light", baseline_grind=20.0)
+    assert high["baseline_used"] == 13.0
+    assert high["recommended"] == 13.0
+    low = recommend_grind_setting_064s("ESPRESSO", "brighter", "dark", baseline_grind=0.5)
+    assert low["baseline_used"] == 1.0
+    assert low["recommended"] == 1.0
+
+    with pytest.raises(ValueError, match="Method must be V60 or ESPRESSO"):
+        recommend_grind_setting_064s("AEROPRESS", "balanced", "light")
+    with pytest.raises(ValueError, match="taste_goal"):
+        recommend_grind_setting_064s("V60", "fruity", "light")